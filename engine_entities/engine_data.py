@@ -1,4 +1,5 @@
 import json
+import orjson
 import re
 from typing import Dict, List, Any, Optional, Tuple, Set
 from dataclasses import dataclass, field
@@ -658,8 +659,8 @@ class FileManager:
     def load_json(file_path: str) -> Any:
         """Load JSON data from file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(file_path, 'rb') as f:
+                return orjson.loads(f.read())
         except Exception as e:
             raise RuntimeError(f"Failed to load JSON from {file_path}: {e}")
     
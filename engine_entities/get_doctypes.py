@@ -8,6 +8,7 @@ It provides functionality to build a hierarchical structure of DocTypes.
 """
 
 import json
+import orjson
 import os
 import re
 import shutil
@@ -610,10 +611,10 @@ class DoctypeProcessor:
         
         else:
             logger.info("Using cached data from data/all_doctypes_data.json")
-            with open("data/all_doctypes_data.json", "r", encoding="utf-8") as f:
-                all_doctype_data = json.load(f)
-            with open("data/all_doctypes_strtucture.json", "r", encoding="utf-8") as f:
-                all_doctype_structure = json.load(f)
+            with open("data/all_doctypes_data.json", "rb") as f:
+                all_doctype_data = orjson.loads(f.read())
+            with open("data/all_doctypes_strtucture.json", "rb") as f:
+                all_doctype_structure = orjson.loads(f.read())
 
         return {
             "data": all_doctype_data, 
@@ -683,10 +684,10 @@ class DoctypeProcessor:
             all_doctype_data = result["data"]
         else:
             logger.info("Using cached data from data/all_doctypes_data.json")
-            with open("data/all_doctypes_data.json", "r", encoding="utf-8") as f:
-                all_doctype_data = json.load(f)
-            with open("data/all_doctypes_strutucture.json", "r", encoding="utf-8") as f:
-                all_doctype_structure = json.load(f)
+            with open("data/all_doctypes_data.json", "rb") as f:
+                all_doctype_data = orjson.loads(f.read())
+            with open("data/all_doctypes_strutucture.json", "rb") as f:
+                all_doctype_structure = orjson.loads(f.read())
 
         # Get main data configuration
         main_doctypes = self.mappings.get_main_data()
@@ -742,5 +743,5 @@ class DoctypeProcessor:
             data, _ = self.data_retriever.get_doctype_data("Formula Group")
             self.data_retriever.save_doctype_data("data", data, "formula_group")
 
-        with open("data/formula_group.json", "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open("data/formula_group.json", "rb") as f:
+            return orjson.loads(f.read())
@@ -4,6 +4,7 @@ This module builds hierarchical tree structures from doctype data.
 """
 
 import json
+import orjson
 import re
 import unicodedata
 import logging
@@ -587,8 +588,8 @@ class FileManager:
     def load_json(file_path: str) -> Dict[str, Any]:
         """Load JSON data from file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(file_path, 'rb') as f:
+                return orjson.loads(f.read())
         except Exception as e:
             logger.error(f"Failed to load JSON from {file_path}: {e}")
             raise
@@ -0,0 +1,27 @@
+"""
+Powered by Renoir
+
+Entries collected for each formula and ID by EngineProcessor.enrich_formulas_with_values
+and consumed by EngineEval.eval_formula.
+"""
+from typing import Any, Dict, List, NamedTuple
+
+
+class AggrEntry(NamedTuple):
+    """Values found for an aggregation function of a formula."""
+
+    # Aggregation function without filter, as in parsed["aggr"][i]["base"]
+    base: str
+    # Node returned by filter_tree_data ({"path", "values"}), [] if nothing was found
+    vars: Any
+    # Values of the filter variables: [{variable: value}]
+    filter: List[Dict[str, Any]]
+
+
+class NonAggrEntry(NamedTuple):
+    """Value found for a variable used directly in a formula."""
+
+    # Requested path, "first(variable)"
+    path: str
+    # Values found for the path
+    values: List[Any]
@@ -9,6 +9,7 @@ import log
 import os
 import json
 from engine_logger import EngineLogger
+from engine_entries import AggrEntry, NonAggrEntry
 from asteval import Interpreter
 from update_tree import UpdateTreeData
 
@@ -45,11 +46,13 @@ class EngineEval(EngineLogger):
             return int(obj)
         elif isinstance(obj, np.floating):
             return float(obj)
+        elif isinstance(obj, np.generic):
+            return obj.item()
         elif isinstance(obj, np.ndarray):
             return obj.tolist()
         elif isinstance(obj, dict):
             return {key: self.convert_numpy_types(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
+        elif isinstance(obj, (list, tuple)):
             return [self.convert_numpy_types(item) for item in obj]
         return obj
 
@@ -432,12 +435,12 @@ class EngineEval(EngineLogger):
                 
                 # Process aggregation variables first
                 for i, value in enumerate(id_eval["data"]):
-                    if "aggr" in value:
+                    if isinstance(value, AggrEntry):
                         
                         # Get the aggregation function
-                        aggr = self.get_aggr(formula, value["aggr"]["base"])
+                        aggr = self.get_aggr(formula, value.base)
                         if not aggr:
-                            self.log_warning(f"Aggregation not found for base: {value['aggr']['base']}", indent=3)
+                            self.log_warning(f"Aggregation not found for base: {value.base}", indent=3)
                             continue
                             
                         # Process each variable in the aggregation
@@ -452,7 +455,7 @@ class EngineEval(EngineLogger):
                                 var_replacements[aggr["base"]] = aggr["eval"].replace(v, new_var)
                             
                             # Add the variable to the interpreter
-                            aggregation_var = value["aggr"]["vars"]
+                            aggregation_var = value.vars
                             if "values" in aggregation_var and len(aggregation_var["values"]) > 0:
                                 if aggregation_var["values"][0] is None:
                                     self.log_warning(f"None value, using 0.0")
@@ -469,15 +472,15 @@ class EngineEval(EngineLogger):
 
                 # Process other (non-aggregation) variables
                 for i, value in enumerate(id_eval["data"]):
-                    if "non_aggr" in value:
-                        self.log_debug(f"Path: {value['non_aggr']['path']}", indent=3)
+                    if isinstance(value, NonAggrEntry):
+                        self.log_debug(f"Path: {value.path}", indent=3)
                         
                         counter += 1
                         pattern = r'e\d{5}v'
-                        matches = re.search(pattern, value["non_aggr"]["path"])
+                        matches = re.search(pattern, value.path)
                         
                         if not matches:
-                            self.log_warning(f"No variable pattern found in path: {value['non_aggr']['path']}", indent=3)
+                            self.log_warning(f"No variable pattern found in path: {value.path}", indent=3)
                             continue
                             
                         var = matches.group()
@@ -489,14 +492,14 @@ class EngineEval(EngineLogger):
                             var_replacements[var] = new_var
                         
                         # Add the variable to the interpreter
-                        if "values" in value["non_aggr"]:
-                            if value["non_aggr"]["values"][0] is None:
+                        if value.values:
+                            if value.values[0] is None:
                                 self.log_warning(f"None value, using 0.0")
                                 aeval.symtable[new_var] =  0.0
                             else:
-                                aeval.symtable[new_var] = value["non_aggr"]["values"][0]
+                                aeval.symtable[new_var] = value.values[0]
                             self.log_info(f"Added: {new_var}", indent=3)
-                            self.log_debug(f"Value: {value['non_aggr']['values'][0]}")                        
+                            self.log_debug(f"Value: {value.values[0]}")                        
                         else:
                             self.log_warning(f"No values, using: 0.0")
                             aeval.symtable[new_var] = 0.0  # Empty array
@@ -553,10 +556,12 @@ class EngineEval(EngineLogger):
                         self.log_info(f"Success - Formula: {id_eval['formula']}", indent=1)
                         self.log_info(f"Result: {result}", indent=2)
 
+                    # Store native Python values (also inside lists and dicts) so the
+                    # results can be serialized without a pass over all the results
                     entity_results["results"].append({
                         "path": id_eval["formula"],
                         "status": "success",
-                        "result": result.tolist() if isinstance(result, np.ndarray) else result,
+                        "result": self.convert_numpy_types(result),
                     })
                     
                 except Exception as e:
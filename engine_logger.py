@@ -1,4 +1,5 @@
 # engine_logger.py
+import logging
 import log.logger
 
 class EngineLogger:
@@ -9,8 +10,15 @@ class EngineLogger:
         prefix = "  " * indent
         self.logger.info(f"{prefix}{message}")
 
+    @property
+    def debug_enabled(self):
+        """True if debug messages are emitted by this logger."""
+        return self.logger.isEnabledFor(logging.DEBUG)
+
     def log_debug(self, message, indent=0):
         """Log debug message with proper indentation."""
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
         prefix = "  " * indent
         self.logger.debug(f"{prefix}{message}")
 
@@ -660,7 +660,10 @@ class FormulaParser:
                 # logger.debug(f"Parsing formula '{formula_path}': {formula_value[:50]}...")
                 
                 try:
-                    f["parsed"] = self.parse_formula(formula_value)
+                    parsed = self.parse_formula(formula_value)
+                    # Paths used to look up the non-aggregated variables of the formula
+                    parsed["first_vars"] = [f"first({v})" for v in parsed.get("vars", [])]
+                    f["parsed"] = parsed
                     formula_count += 1
                     # logger.debug(f"Successfully parsed formula '{formula_path}'")
                 except Exception as e:
@@ -33,8 +33,17 @@ Dependencies:
 - engine_parser: For parsing formula syntax
 - log.logger: For logging events and errors
 """
+import os
+import sys
+import gc
 import json
-import copy
+import argparse
+import functools
+import multiprocessing
+import orjson
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import QueueListener
 # from os import urandom
 # from pydoc import classify_class_attrs
 from sqlite3.dbapi2 import Timestamp
@@ -43,20 +52,375 @@ import engine_parser
 import engine_eval
 import update_tree
 import engine_entities.engine_data, engine_entities.get_doctypes, engine_parser 
-from typing import Dict, List, Any
-from filters.filters_paths import tree_data_filter
-from log.logger import get_logger
+from typing import Dict, List, Any, Optional
+from filters.filters_paths import tree_data_filter, PLACEHOLDER_MARKER
+from log.logger import get_logger, get_env_var, get_env_bool, setup_worker_logger, worker_log_environment
 from variable_filter import FilterVariableExtractor
 from engine_logger import EngineLogger
+from engine_entries import AggrEntry, NonAggrEntry
 from formula_classifier import FormulaExecutionClassifier
 from engine_entities.arteris_frappe import ArterisApi
 from pathlib import Path
 
+# Worker process state, set once per pool by _init_worker
+_worker_processor = None
+_worker_groups = None
+
+def _init_worker(tree_data: Dict[str, Any], groups: List[tuple], log_queue) -> None:
+    """
+    Initialize a worker process of enrich_formulas_with_values.
+
+    The tree and the prepared formula groups are received once per worker,
+    instead of being pickled with every task. Log records are sent to the
+    main process, which owns the log file.
+    """
+    global _worker_processor, _worker_groups
+    setup_worker_logger(log_queue)
+    _worker_processor = EngineProcessor(workers=1)
+    _worker_processor._reset_filter_cache(tree_data)
+    _worker_groups = groups
+
+def _process_id(task: tuple) -> Dict[str, Any]:
+    """
+    Enrich the formulas of one (group index, ID) task in a worker process.
+    """
+    group_index, id_value = task
+    group_path, prepared, group_first_vars = _worker_groups[group_index]
+    return _worker_processor._enrich_id(group_path, prepared, group_first_vars, id_value)
+
 class EngineProcessor(EngineLogger):
 
-    def __init__(self):
+    def __init__(self, debug: bool = False, workers: int = None):
         self.logger = get_logger("Engine - Processor")
+        # Debug messages are built only when they are emitted (hot loops)
+        self._debug_on = self.debug_enabled
         self.data_filter = tree_data_filter()
+        # Debug runs write indented, human readable JSON files
+        self.debug = debug
+        # Per classifier group result files are diagnostic, written only with ENGINE_DEBUG_DUMP
+        self.debug_dump = get_env_bool("ENGINE_DEBUG_DUMP")
+        # Number of processes used to enrich the formulas (ENGINE_WORKERS, default: 1)
+        if workers is None:
+            workers = get_env_var("ENGINE_WORKERS", 1, int)
+        self.workers = workers
+        # Starting a pool costs about a second, smaller groups are processed serially
+        self.min_parallel_ids = get_env_var("ENGINE_MIN_PARALLEL_IDS", 500, int)
+        # Per-run memoization of tree lookups, reset by _reset_filter_cache
+        self._tree_data = None
+        self._tree_id = None
+        self._filter_cache = functools.lru_cache(maxsize=None)(self._filter_tree_data)
+        # Filter expressions repeat across IDs, analyze each one only once
+        self._fve = FilterVariableExtractor()
+        self._filter_variables = functools.lru_cache(maxsize=None)(self._extract_filter_variables)
+
+    def _save_json(self, data: Any, file_path: str) -> None:
+        """
+        Save data to a JSON file.
+
+        Uses orjson (compact, numpy aware) unless the processor runs in debug
+        mode, where the file is written indented with the standard library.
+
+        Args:
+            data: Data to save
+            file_path: Path of the output file
+        """
+        if self.debug:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+        else:
+            with open(file_path, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY))
+
+    def _reset_filter_cache(self, tree_data: Optional[Dict[str, Any]]) -> None:
+        """
+        Bind the lookup cache to a tree and drop any previously cached results.
+
+        The tree is updated in place between formula groups (see update_tree), so
+        the cache must be reset on every enrichment run, not only per contract.
+
+        Args:
+            tree_data: The tree data structure used by the following lookups, None to release it
+        """
+        self._tree_data = tree_data
+        self._tree_id = id(tree_data)
+        self._filter_cache.cache_clear()
+
+    def _filter_tree_data(self, tree_id: int, return_paths: tuple, record_id: Any,
+                          filter_expr: Any, lock_node: bool, compiled_filter: Any) -> List[Dict[str, Any]]:
+        # tree_id only takes part in the cache key; filter_tree_data consumes
+        # return_paths, so it always receives a fresh list
+        return self.data_filter.filter_tree_data(
+            self._tree_data,
+            list(return_paths),
+            record_id,
+            filter_expr=filter_expr,
+            lock_node=lock_node,
+            compiled_filter=compiled_filter)
+
+    def _extract_filter_variables(self, filter_expr: str) -> tuple:
+        """
+        Extract the right side variables of a filter expression and highlight them.
+
+        Args:
+            filter_expr: The filter expression of an aggregation function
+
+        Returns:
+            Tuple (filter_vars, highlighted_expr, compiled_filter). highlighted_expr
+            and compiled_filter are None when the expression has no variables to
+            resolve; compiled_filter is also None if the template cannot be
+            compiled, in which case the string expression is used.
+        """
+        filter_vars = tuple(self._fve.extract_unique_variables(filter_expr))
+        if not filter_vars:
+            return filter_vars, None, None
+        highlighted_expr = self._fve.highlight_variables(filter_expr)
+        try:
+            compiled_filter = self.data_filter.compile_filter(highlighted_expr)
+        except ValueError as e:
+            self.log_warning(f"Filter expression not compiled, using string substitution: {e}")
+            compiled_filter = None
+        return filter_vars, highlighted_expr, compiled_filter
+
+    def _filter_value_literal(self, value: Any) -> str:
+        """
+        Write a filter variable value as a literal of the filter expression.
+
+        Numbers are written as they are and anything else is enclosed in quotes.
+
+        Args:
+            value: Value of the variable
+
+        Returns:
+            The literal to place in the filter expression
+        """
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # Already a number, no need to try the conversion
+            return str(value)
+        try:
+            # Check if the value is a number
+            float(value)
+            return str(value)
+        except (ValueError, TypeError):
+            # Enclose in quotes if not a number
+            return f"'{value}'"
+
+    def _substitute_filter_variables(self, filter_expr: str, literals: Dict[str, str]) -> str:
+        """
+        Replace the highlighted variables (__var__) of a filter expression with their literals.
+
+        All variables are replaced in a single pass over the expression; variables
+        without a value keep their marker.
+
+        Args:
+            filter_expr: Filter expression with highlighted variables
+            literals: Mapping of variable name to its literal (see _filter_value_literal)
+
+        Returns:
+            The filter expression with the variables replaced
+        """
+        return PLACEHOLDER_MARKER.sub(lambda m: literals.get(m.group(1), m.group(0)), filter_expr)
+
+    def _cached_filter(self, return_paths: List[str], record_id: Any = None,
+                       filter_expr: Any = None, lock_node: bool = False,
+                       compiled_filter: Any = None) -> List[Dict[str, Any]]:
+        """
+        Memoized version of tree_data_filter.filter_tree_data for the bound tree.
+
+        The returned nodes are shared between calls and must not be mutated.
+
+        Args:
+            return_paths: Paths to extract values for
+            record_id: Optional record ID to limit the search
+            filter_expr: Optional filter expression
+            lock_node: Lock the search on the record ID
+            compiled_filter: Optional pre-compiled AST of filter_expr
+
+        Returns:
+            List of nodes with path and values, as returned by filter_tree_data
+        """
+        return self._filter_cache(
+            self._tree_id,
+            tuple(return_paths),
+            record_id,
+            filter_expr or None,
+            bool(lock_node),
+            compiled_filter)
+
+    def _enrich_id(self, group_path: str, prepared: List[tuple], group_first_vars: List[str], id_value: Any) -> Dict[str, Any]:
+        """
+        Enrich the formulas of a group with the variable values of one ID.
+
+        Args:
+            group_path: Path of the formula group (entity)
+            prepared: Per-formula data prepared by enrich_formulas_with_values
+            group_first_vars: Every "first(v)" path needed by the formulas of the group
+            id_value: The ID to extract the values for
+
+        Returns:
+            Dictionary with entity, ID and formula data for this ID
+        """
+        if self._debug_on:
+            self.log_debug(f"Processing ID {id_value} for group {group_path}")
+
+        formula_ids = defaultdict(list)
+
+        # Non-aggregated variables of all formulas, indexed by "first(v)" path
+        first_nodes = {}
+        if group_first_vars:
+            try:
+                # Apply "first" transformation to get only the first match for each variable
+                node = self._cached_filter(
+                    group_first_vars,
+                    id_value,
+                    filter_expr=None)
+                first_nodes = {sys.intern(n["path"]): n for n in node}
+            except Exception as e:
+                self.log_error(f"Error processing non-aggregated variables: {e}")
+                raise
+
+        # For each formula, extract variable values
+        formula_count = 0
+        for formula_path, formula_value, vars, aggr_specs, first_vars in prepared:
+            if self._debug_on:
+                self.log_debug(f"Processing formula {formula_count + 1}/{len(prepared)} for ID {id_value}: {formula_path}")
+            formula_count += 1
+            # self.log_debug(f"Processing formula: {formula_path}: {formula_value} for ID: {id_value}")
+
+            # Create the entry for this formula path, kept even if it stays empty
+            bucket = formula_ids[formula_path]
+
+            # Process non-aggregated variables
+            # These are direct variable references without aggregation functions
+            #self.log_debug(f"Extracting non-aggregated variables: {vars}")
+            for fv in first_vars:
+                # Dispatch the nodes fetched for the whole group back to this formula
+                n = first_nodes.get(fv)
+                if n:
+                    bucket.append(NonAggrEntry(n["path"], n["values"]))
+
+            # Process aggregation functions (sum, avg, etc.)
+            #self.log_debug(f"Processing {len(aggr_specs)} aggregation functions")
+
+            for base, vars, filter_expr, is_global, filter_paths, new_filter_expr, compiled_template in aggr_specs:
+
+                filter_aggr_expr = []
+                compiled_filter = None
+
+                # Check if exits var fields in right side of filter expression
+                if filter_expr:
+                    # If there are variables in the filter expression, we need to process them
+                    if filter_paths:
+                        # self.log_debug(f"Filter expression found: {filter_expr}")
+                        # self.log_debug(f"Get values for right variables: {filter_paths}")
+                        filter_literals = {}
+                        try:
+                            # Apply "first" transformation to get only the first match for each variable
+                            for v, first_path in filter_paths:
+                                # self.log_debug(f"Searching for variable: {v} in tree data")
+                                # Search for the variable in the tree data
+                                node = self._cached_filter(
+                                    return_paths=first_path,
+                                    record_id=id_value,
+                                    lock_node=True)
+                                if node:
+                                    n_value = node[0]["values"][0]
+                                    # Append the variable value to the filter aggregation expression
+                                    filter_aggr_expr.append({v:n_value})
+                                    filter_literals[v] = self._filter_value_literal(n_value)
+                                    # self.log_debug(f"Found variable value {n_value}")
+                            # Fill the compiled template instead of parsing a new expression
+                            if compiled_template is not None:
+                                compiled_filter = self.data_filter.bind_filter(compiled_template, filter_literals)
+                            if compiled_filter is None:
+                                # Replace the variables in the filter expression
+                                new_filter_expr = self._substitute_filter_variables(new_filter_expr, filter_literals)
+                        except Exception as e:
+                            self.log_error(f"Error processing non-aggregated variables: {e}")
+                            raise
+                        # self.log_debug(f"Updated filter expression: {new_filter_expr}")
+                        # Change the filter expression to the new one with values; with a
+                        # bound AST the template only names the filter (cache key, logs)
+                        filter_expr = new_filter_expr
+
+                if self._debug_on:
+                    self.log_debug(f"Processing aggregation function - vars: {vars}, filter: {filter_expr}, global: {is_global}")
+
+                # Search for the variable in the tree data
+                # Global aggregations search across the entire tree
+                if is_global:
+                    if self._debug_on:
+                        self.log_debug("Processing global aggregation")
+                    try:
+                        if filter_expr:
+                            # self.log_debug(f"Applying global filter: {filter_expr}")
+                            # For variables in aggregation functions with filter
+                            # Global filter ignores the ID
+                            node = self._cached_filter(
+                                vars, 
+                                filter_expr=filter_expr,
+                                compiled_filter=compiled_filter)
+                        else:
+                            # self.log_debug("No filter applied, getting all values")
+                            # If no filter, just get all values
+                            node = self._cached_filter(
+                                vars)
+                        # self.log_debug(f"Found {len(node)} nodes for global aggregation")
+                        # Append all values to the formula_ids
+                        for n in node:
+                            bucket.append(AggrEntry(base, n, filter_aggr_expr))
+                        # If no nodes found
+                        if not node:
+                            bucket.append(AggrEntry(base, [], filter_aggr_expr))
+                    except Exception as e:
+                        self.log_error(f"Error processing global aggregation: {e}")
+                        raise
+
+                # Local aggregations only search within the current ID and its subnodes
+                else:
+                    if self._debug_on:
+                        self.log_debug("Processing local aggregation (ID-specific)")
+                    try:
+                        if filter_expr:
+                            # self.log_debug(f"Applying local filter with ID {id_value}: {filter_expr}")
+                            # For variables in aggregation functions with filter
+                            node = self._cached_filter(
+                                vars, 
+                                id_value, 
+                                filter_expr, 
+                                lock_node=True,
+                                compiled_filter=compiled_filter)
+                        else:
+                            # self.log_debug(f"No filter applied, getting all values for ID {id_value}")
+                            # If no filter, just get all values
+                            node = self._cached_filter(
+                                vars, 
+                                id_value, 
+                                lock_node=True)
+                        # self.log_debug(f"Found {len(node)} nodes for local aggregation")
+                        for n in node:  
+                            bucket.append(AggrEntry(base, n, filter_aggr_expr))
+                        # If no nodes found
+                        if not node:
+                            bucket.append(AggrEntry(base, [], filter_aggr_expr))
+                    except Exception as e:
+                        self.log_error(f"Error processing local aggregation: {e}")
+                        raise
+
+        # Temporarily store the results for this ID
+        # self.log_debug(f"Creating result for ID {id_value} with {len(formula_ids)} formulas")
+        id_result = {
+            "formulas": []
+        }
+        for key, value in formula_ids.items():
+            id_result["formulas"].append({"formula": key, "data": value})
+
+        # Add this ID's results to the group
+        group_item = {
+            "entity": group_path,
+            "id": id_value,
+            "formula_data": id_result
+        }
+        return group_item
 
     def enrich_formulas_with_values(self, extracted_formulas: List[Dict[str, Any]], tree_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -90,6 +454,9 @@ class EngineProcessor(EngineLogger):
         self.log_info(f"Starting to process formula variables for {len(extracted_formulas)} formula groups")
         
         group_result = []
+        # Prepared formula data of each group and (group index, ID) tasks
+        groups = []
+        tasks = []
     
         datetime = Timestamp.now()
         total_count_01 = 0
@@ -99,195 +466,81 @@ class EngineProcessor(EngineLogger):
         count_02 = 0
         count_03 = 0        
 
-        # self.data_filter.clear_cache()
+        # Lookups are memoized for this run only
+        self._reset_filter_cache(tree_data)
 
         total_count_01 = len(extracted_formulas)
         count_01 = 0
         for i, formula_group in enumerate(extracted_formulas):
             count_01 += 1
-            self.log_debug(f"Processing formula group {i+1}/{len(extracted_formulas)}: {formula_group.get('path', 'unknown')}")
+            if self._debug_on:
+                self.log_debug(f"Processing formula group {i+1}/{len(extracted_formulas)}: {formula_group.get('path', 'unknown')}")
             
-            # Process each ID in the group
-            id_obj_count = 0
-            total_count_02 = len(formula_group['ids'])
-            count_02 = 0
-            for id_obj in formula_group.get("ids", []):
-                count_02 += 1
-                self.log_debug(f"Processing ID object {id_obj_count + 1}/{len(formula_group['ids'])} for group {formula_group.get('path', 'unknown')}")
-                id_obj_count += 1
-                id_value = id_obj["id"]
-                # self.log_debug(f"Processing ID: {id_value}")
-                
-                formula_ids = {}
-
-                # For each formula, extract variable values
-                formula_count = 0
-                
-                total_count_03 = len(formula_group['formulas'])
-                count_03 = 0
-                for formula in formula_group["formulas"]:
-                    count_03 += 1
-                    self.log_debug(f"Processing formula {formula_count + 1}/{len(formula_group['formulas'])} for ID {id_value}: {formula.get('path', 'unknown')}")
-                    formula_count += 1
-                    # formula_path = formula["path"]
-                    # formula_value = formula['value']
-                    # self.log_debug(f"Processing formula: {formula_path}: {formula_value} for ID: {id_value}")
-
-                    # Create a new entry for this formula path if it doesn't exist
-                    formula_ids.setdefault(formula["path"], [])
-
-                    # Process non-aggregated variables
-                    # These are direct variable references without aggregation functions
-                    vars = formula.get("parsed", []).get("vars", [])
-                    #self.log_debug(f"Extracting non-aggregated variables: {vars}")
-                    if vars:
-                        try:
-                            # Apply "first" transformation to get only the first match for each variable
-                            node = self.data_filter.filter_tree_data(
-                                tree_data,
-                                [f"first({v})" for v in vars], 
-                                id_value, 
-                                filter_expr=None)
-                            #self.log_debug(f"Found {len(node)} non-aggregated variable nodes")
-                            for n in node:
-                                formula_ids[formula["path"]].append({"non_aggr": n})
-                        except Exception as e:
-                            self.log_error(f"Error processing non-aggregated variables: {e}")
-                            raise
-
-                    # Process aggregation functions (sum, avg, etc.)
-                    aggr_funcs = formula.get("parsed", []).get("aggr", [])
-                    #self.log_debug(f"Processing {len(aggr_funcs)} aggregation functions")
-                    
-                    for aggr in aggr_funcs:
-
-                        vars = aggr["vars"]
-                        filter_expr = aggr["filter"]
-                        is_global = aggr["global"]
-
-                        filter_aggr_expr = []
-
-                        # Check if exits var fields in right side of filter expression
-                        if filter_expr:
-                            # Extract unique variables from the filter expression
-                            filter_vars = FilterVariableExtractor().extract_unique_variables(filter_expr)
-                            # If there are variables in the filter expression, we need to process them
-                            if filter_vars:
-                                # self.log_debug(f"Filter expression found: {filter_expr}")
-                                # Highlight variables in the filter expression
-                                new_filter_expr = FilterVariableExtractor().highlight_variables(filter_expr)
-                                # self.log_debug(f"Get values for right variables: {filter_vars}")
-                                try:
-                                    # Apply "first" transformation to get only the first match for each variable
-                                    for v in filter_vars:
-                                        # Set function to get the first value of the variable
-                                        var_list = [f"first({v})"]
-                                        # self.log_debug(f"Searching for variable: {v} in tree data")
-                                        # Search for the variable in the tree data
-                                        node = self.data_filter.filter_tree_data(
-                                            tree_data,
-                                            return_paths=var_list,
-                                            record_id=id_value,
-                                            lock_node=True)
-                                        if node:
-                                            n_value = node[0]["values"][0]
-                                            # Append the variable value to the filter aggregation expression
-                                            filter_aggr_expr.append({v:n_value})
-                                            # self.log_debug(f"Found variable value {n_value}")
-                                            try:
-                                                # Check if the value is a number
-                                                float(n_value)
-                                            except (ValueError, TypeError):
-                                                # Enclose in quotes if not a number
-                                                n_value = f"'{n_value}'"  
-                                            # Replace the variable in the filter expression
-                                            new_filter_expr = new_filter_expr.replace(f"__{v}__", n_value)
-                                except Exception as e:
-                                    self.log_error(f"Error processing non-aggregated variables: {e}")
-                                    raise
-                                # self.log_debug(f"Updated filter expression: {new_filter_expr}")
-                                # Change the filter expression to the new one with values
-                                filter_expr = new_filter_expr
-                        
-                        self.log_debug(f"Processing aggregation function - vars: {vars}, filter: {filter_expr}, global: {is_global}")
-
-                        # Search for the variable in the tree data
-                        # Global aggregations search across the entire tree
-                        if is_global:
-                            self.log_debug("Processing global aggregation")
-                            try:
-                                if filter_expr:
-                                    # self.log_debug(f"Applying global filter: {filter_expr}")
-                                    # For variables in aggregation functions with filter
-                                    # Global filter ignores the ID
-                                    node = self.data_filter.filter_tree_data(
-                                        tree_data, 
-                                        vars, 
-                                        filter_expr=filter_expr)
-                                else:
-                                    # self.log_debug("No filter applied, getting all values")
-                                    # If no filter, just get all values
-                                    node = self.data_filter.filter_tree_data(
-                                        tree_data, 
-                                        vars)
-                                # self.log_debug(f"Found {len(node)} nodes for global aggregation")
-                                # Append all values to the formula_ids
-                                for n in node:
-                                    formula_ids[formula["path"]].append({"aggr": {"base": aggr["base"], "vars": n, "filter": filter_aggr_expr}})
-                                # If no nodes found
-                                if not node:
-                                    formula_ids[formula["path"]].append({"aggr": {"base": aggr["base"], "vars": [], "filter": filter_aggr_expr}})
-                            except Exception as e:
-                                self.log_error(f"Error processing global aggregation: {e}")
-                                raise
-
-                        # Local aggregations only search within the current ID and its subnodes
-                        else:
-                            self.log_debug("Processing local aggregation (ID-specific)")
-                            try:
-                                if filter_expr:
-                                    # self.log_debug(f"Applying local filter with ID {id_value}: {filter_expr}")
-                                    # For variables in aggregation functions with filter
-                                    node = self.data_filter.filter_tree_data(
-                                        tree_data, 
-                                        vars, 
-                                        id_value, 
-                                        filter_expr, 
-                                        lock_node=True)
-                                else:
-                                    # self.log_debug(f"No filter applied, getting all values for ID {id_value}")
-                                    # If no filter, just get all values
-                                    node = self.data_filter.filter_tree_data(
-                                        tree_data, 
-                                        vars, 
-                                        id_value, 
-                                        lock_node=True)
-                                # self.log_debug(f"Found {len(node)} nodes for local aggregation")
-                                for n in node:  
-                                    formula_ids[formula["path"]].append({"aggr": aggr["base"], "vars": n, "filter": filter_aggr_expr})
-                                # If no nodes found
-                                if not node:
-                                    formula_ids[formula["path"]].append({"aggr": {"base": aggr["base"], "vars": [], "filter": filter_aggr_expr}})
-                            except Exception as e:
-                                self.log_error(f"Error processing local aggregation: {e}")
-                                raise
-
-                # Temporarily store the results for this ID
-                # self.log_debug(f"Creating result for ID {id_value} with {len(formula_ids)} formulas")
-                id_result = {
-                    "formulas": []
-                }
-                for key, value in formula_ids.items():
-                    id_result["formulas"].append({"formula": key, "data": copy.deepcopy(value)})
-
-                # Add this ID's results to the group
-                group_item = {
-                    "entity": formula_group["path"],
-                    "id": id_value,
-                    "formula_data": copy.deepcopy(id_result)
-                }
-                group_result.append(group_item)
-                # self.log_debug(f"Added result for entity {formula_group['path']}, ID {id_value}")
+            # Formula data does not depend on the ID, prepare it once per group:
+            # (path, value, non-aggregated vars, aggregation specs, "first(v)" paths)
+            # Paths and variable names are dict keys for every ID, they are interned
+            prepared = []
+            for formula in formula_group["formulas"]:
+                parsed = formula.get("parsed") or {}
+                formula_vars = [sys.intern(v) for v in parsed.get("vars", [])]
+                # Aggregations with their filter analysis and compiled filter template:
+                # (base, vars, filter, global, ((filter var, "first(var)" path), ...),
+                #  highlighted filter, compiled template)
+                aggr_specs = []
+                for aggr in parsed.get("aggr", []):
+                    filter_expr = aggr["filter"]
+                    filter_vars, highlighted_expr, compiled_template = (
+                        self._filter_variables(filter_expr) if filter_expr else ((), None, None))
+                    aggr_specs.append((
+                        sys.intern(aggr["base"]),
+                        aggr["vars"],
+                        filter_expr,
+                        aggr["global"],
+                        tuple((v, (sys.intern(f"first({v})"),)) for v in filter_vars),
+                        highlighted_expr,
+                        compiled_template))
+                prepared.append((
+                    sys.intern(formula["path"]),
+                    formula["value"],
+                    formula_vars,
+                    aggr_specs,
+                    [sys.intern(fv) for fv in parsed.get("first_vars") or [f"first({v})" for v in formula_vars]]))
+
+            # Every "first(v)" needed by the formulas of this group, so the
+            # non-aggregated variables are fetched with a single tree walk per ID
+            group_first_vars = list(dict.fromkeys(
+                fv for _, _, _, _, first_vars in prepared for fv in first_vars))
+
+            groups.append((sys.intern(formula_group["path"]), prepared, group_first_vars))
+            tasks.extend((len(groups) - 1, id_obj["id"]) for id_obj in formula_group.get("ids", []))
+
+        # Every ID is independent, process them in parallel when it pays off
+        if self._debug_on:
+            self.log_debug(f"Processing {len(tasks)} IDs with {min(self.workers, len(tasks))} worker(s)")
+        if self.workers > 1 and len(tasks) >= max(2, self.min_parallel_ids):
+            workers = min(self.workers, len(tasks))
+            chunksize = max(1, len(tasks) // (8 * workers))
+            # Workers are not forked from this process, which runs the log listener thread
+            methods = multiprocessing.get_all_start_methods()
+            mp_context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            # Worker records are written by this process, through the handlers of the main logger
+            log_queue = mp_context.Queue()
+            log_listener = QueueListener(log_queue, *get_logger().handlers, respect_handler_level=True)
+            log_listener.start()
+            try:
+                # Workers are started without file and console handlers
+                with worker_log_environment(), ProcessPoolExecutor(
+                        max_workers=workers,
+                        mp_context=mp_context,
+                        initializer=_init_worker,
+                        initargs=(tree_data, groups, log_queue)) as executor:
+                    group_result = list(executor.map(_process_id, tasks, chunksize=chunksize))
+            finally:
+                log_listener.stop()
+        else:
+            for group_index, id_value in tasks:
+                group_path, prepared, group_first_vars = groups[group_index]
+                group_result.append(self._enrich_id(group_path, prepared, group_first_vars, id_value))
         
         self.log_info(f"Formula variable processing complete. Processed {len(group_result)} ID results")
         return group_result
@@ -410,8 +663,8 @@ class EngineProcessor(EngineLogger):
 
                 # Reading contract data from cache from file contract_data_{c['contrato']}.json
                 try:
-                    with open(f"contract_data_{c['contrato']}.json", 'r', encoding='utf-8') as f:
-                        contract_data = json.load(f)
+                    with open(f"contract_data_{c['contrato']}.json", 'rb') as f:
+                        contract_data = orjson.loads(f.read())
                 except FileNotFoundError:
                     use_cached_data = False
 
@@ -428,14 +681,14 @@ class EngineProcessor(EngineLogger):
                 self.log_error(f"No contract data found for {c['contrato']}. Skipping.")
                 continue
 
-            # Extract contract formula IDs
-            contract_formula_id = None
-            
-            try: 
-                contract_formula_id = find_formula_group(find_contract[0])               
-            except Exception as e:
-                self.log_error(f"Error extracting contract formula IDs for {c['contrato']}: {e}")
-                continue
+            # Extract contract formula IDs, usually in the first contract record
+            contract_records = find_contract[0].get('Contract') or [{}]
+            contract_formula_id = (contract_records[0].get('grupoformulas')
+                                   if isinstance(contract_records, list) and isinstance(contract_records[0], dict)
+                                   else None)
+            if not contract_formula_id:
+                # Fall back to searching the whole contract structure
+                contract_formula_id = find_formula_group(find_contract[0])
 
             if not contract_formula_id:
                 self.log_error(f"No formula group IDs found for contract {c['contrato']}. Skipping.")
@@ -462,6 +715,7 @@ class EngineProcessor(EngineLogger):
             classifier = FormulaExecutionClassifier(extract_formulas)
             classifier_groups = classifier.get_execution_order()
 
+            enrich_formulas = engine_results = _engine_results = utree = None
             for g in classifier_groups:
 
                 group_formulas = {}
@@ -496,26 +750,28 @@ class EngineProcessor(EngineLogger):
                 engine_results = engine.eval_formula(enrich_formulas, group_extract_formulas, engine_data_tree)
                     
                 # Print summary of results
-                success_count = sum(1 for entity in engine_results for fr in entity["results"] if fr["status"] == "success")
-                error_count = sum(1 for entity in engine_results for fr in entity["results"] if fr["status"] == "error")
+                # Count and collect the errors in a single pass over the results
+                success_count = 0
+                str_errors = []
+                for r in engine_results:
+                    for fr in r["results"]:
+                        if fr["status"] == "success":
+                            success_count += 1
+                        elif fr["status"] == "error":
+                            str_errors.append(f"Error in formula: {fr['path']}, Id: {r['id']}, Error: {fr['error']}")
+                error_count = len(str_errors)
                 engine.log_info(f"Formula evaluation complete. Successful: {success_count}, Errors: {error_count}")
                 if error_count > 0:
-                    str_errors = []
-                    for r in engine_results:
-                        for error in r["results"]:
-                            if error["status"] == "error":
-                                str_erro = f"Error in formula: {error['path']}, Id: {r['id']}, Error: {error['error']}"
-                                str_errors.append(str_erro)
-                                engine.log_info(str_erro)
-                    if len(str_errors)>0:
-                        ufrappe.write_errors(c['boletimmedicao'], str_errors)
-                        
-                # Convert numpy types to native Python types before saving
-                _engine_results = engine.convert_numpy_types(engine_results)
+                    for str_erro in str_errors:
+                        engine.log_info(str_erro)
+                    ufrappe.write_errors(c['boletimmedicao'], str_errors)
+                    
+                # Results already hold native Python types (see EngineEval.eval_formula)
+                _engine_results = engine_results
                 engine_results_converted.extend(_engine_results)
 
-                with open(f"engine_result_g{g}_{c['contrato']}.json", 'w', encoding='utf-8') as f:
-                    json.dump(_engine_results, f, indent=4, ensure_ascii=False)
+                if self.debug_dump:
+                    self._save_json(_engine_results, f"engine_result_g{g}_{c['contrato']}.json")
 
                 # Select the first formula to update
                 for to_update_formula in group_extract_formulas:
@@ -540,10 +796,21 @@ class EngineProcessor(EngineLogger):
             print(c['boletimmedicao'])
             print('...')
 
+            # Release the contract structures before the next contract is built
+            del contract_data, find_contract, contract_records, contract_formula
+            del data_builder, engine_data_tree, extract_formulas, enrich_formulas
+            del engine_results, _engine_results, utree, engine_results_converted
+            self._reset_filter_cache(None)
+            gc.collect()
+
         ufrappe.update_sap_orders_balance()
 
 if __name__ == "__main__":
-    processor = EngineProcessor()
+    arg_parser = argparse.ArgumentParser(description="Hierarchical engine formula processor")
+    arg_parser.add_argument("--debug", action="store_true", help="Write indented JSON result files")
+    args = arg_parser.parse_args()
+
+    processor = EngineProcessor(debug=args.debug)
     try:
         processor.calculate_measurements(use_cached_data=True)
     except Exception as e:
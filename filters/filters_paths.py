@@ -33,6 +33,7 @@ import ply.yacc as yacc  # Syntactic analyzer for parsing expressions
 from typing import Dict, Any, Optional, List, Union, Callable
 import hashlib
 import json
+import functools
 from typing import Any
 # Import the logger
 from log.logger import get_logger
@@ -42,6 +43,15 @@ from log.logger import get_logger
 logger = get_logger("filters")
 logger.info("Filters module initialized")
 
+# Variable markers inserted by FilterVariableExtractor.highlight_variables (__e00001v__),
+# limited to its variable pattern so "__" inside string literals is left alone
+PLACEHOLDER_MARKER = re.compile(r'__([eE]\d{5}[vV])__')
+# Prefix of the identifiers that stand for placeholders in a compiled filter AST
+PLACEHOLDER_PREFIX = 'placeholder__'
+# Literals read as a single token by the lexer (same patterns as t_NUMBER and t_STRING)
+NUMBER_LITERAL = re.compile(r'\d+')
+STRING_LITERAL = re.compile(r"'[^']*'")
+
 class tree_data_filter:
     """
     Class that implements a parser and evaluator of filter expressions for hierarchical data.
@@ -222,6 +232,9 @@ class tree_data_filter:
         """
         self.lexer = lex.lex(module=self)
         self.parser = yacc.yacc(module=self)
+        # Parsed expressions are reused, the same filters are applied for many records
+        self._parse_cache = functools.lru_cache(maxsize=1024)(self.parse)
+        self._compile_cache = functools.lru_cache(maxsize=None)(self._compile_filter)
         # self.result_cache = {}
         # self.filtered_nodes = []
 
@@ -305,13 +318,96 @@ class tree_data_filter:
         #     logger.warning(f"Failed to parse expression: {expression}")
         return ast
     
-    def convert_to_python_function(self, expression: str) -> Callable:
+    def _compile_filter(self, filter_expr: str) -> tuple:
+        """
+        Parses a highlighted filter expression into an AST with placeholder slots.
+        
+        Args:
+            filter_expr: Expression with variables marked as __var__
+                         (ex: "e00001v == __e00002v__")
+            
+        Returns:
+            AST where each marked variable is an identifier node named
+            PLACEHOLDER_PREFIX + var
+            
+        Raises:
+            ValueError: If the expression cannot be parsed
+        """
+        expression = PLACEHOLDER_MARKER.sub(lambda m: f"{PLACEHOLDER_PREFIX}{m.group(1)}", filter_expr)
+        ast = self._parse_cache(expression)
+        if ast is None:
+            error_msg = f"Could not parse the expression: {filter_expr}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        return ast
+
+    def compile_filter(self, filter_expr: str) -> tuple:
+        """
+        Cached version of _compile_filter, each distinct template is parsed once.
+        
+        Args:
+            filter_expr: Expression with variables marked as __var__
+            
+        Returns:
+            AST with placeholder slots, to be completed with bind_filter
+        """
+        return self._compile_cache(filter_expr)
+
+    def bind_filter(self, compiled_filter: tuple, literals: Dict[str, str]) -> Optional[tuple]:
+        """
+        Replaces the placeholder slots of a compiled filter with literal values.
+        
+        Each literal is the text the value takes in the substituted expression and
+        is read the way the lexer reads it, so the bound AST is the one parse returns
+        for that expression.
+        
+        Args:
+            compiled_filter: AST returned by compile_filter
+            literals: Mapping of variable name to its literal (ex: "3", "'abc'")
+            
+        Returns:
+            AST ready to be evaluated, or None if a placeholder has no literal or a
+            literal is not a single number, string or boolean token (ex: "-3", "1.5");
+            the substituted expression must then be parsed to get the same result.
+        """
+        nodes = {}
+        for name, text in literals.items():
+            text = text.strip(self.t_ignore)
+            if NUMBER_LITERAL.fullmatch(text):
+                node = ('number', int(text))
+            elif STRING_LITERAL.fullmatch(text):
+                node = ('string', text[1:-1])
+            elif text in ('True', 'False'):
+                node = ('boolean', text)
+            else:
+                return None
+            nodes[f"{PLACEHOLDER_PREFIX}{name}"] = node
+
+        def bind(node):
+            if node[0] == 'identifier':
+                if node[1].startswith(PLACEHOLDER_PREFIX):
+                    if node[1] not in nodes:
+                        raise KeyError(node[1])
+                    return nodes[node[1]]
+                return node
+            if node[0] in ('number', 'string', 'boolean'):
+                return node
+            return tuple(bind(child) if isinstance(child, tuple) else child for child in node)
+
+        try:
+            return bind(compiled_filter)
+        except KeyError:
+            return None
+
+    def convert_to_python_function(self, expression: str, ast: Optional[tuple] = None) -> Callable:
         """
         Converts a conditional expression to a Python function that can be
         used to filter records.
         
         Args:
             expression: Conditional expression (ex: "e00001v == 1")
+            ast: Optional pre-compiled AST of the expression (see compile_filter
+                 and bind_filter). When provided the expression is not parsed.
             
         Returns:
             A Python function that accepts a record and returns True/False
@@ -321,7 +417,8 @@ class tree_data_filter:
         """
 
         # Parse the expression to generate the AST
-        ast = self.parse(expression)
+        if ast is None:
+            ast = self._parse_cache(expression)
         if ast is None:
             error_msg = f"Could not parse the expression: {expression}"
             logger.error(error_msg)
@@ -1030,7 +1127,8 @@ class tree_data_filter:
             return_paths: List[str], 
             record_id: Optional[str] = None, 
             filter_expr: Optional[str] = None, 
-            lock_node: Optional[bool] = False) -> Union[List[Dict], Dict[str, Any]]:
+            lock_node: Optional[bool] = False,
+            compiled_filter: Optional[tuple] = None) -> Union[List[Dict], Dict[str, Any]]:
         # logger.info(f"===== Starting filter operation =====")
         """
         Filters tree data using a custom conditional expression.
@@ -1047,6 +1145,8 @@ class tree_data_filter:
                         to its corresponding values from the filtered records.
             record_id: Optional record ID to limit the search
             lock_node: Optional flag to lock the search on the record ID
+            compiled_filter: Optional pre-compiled AST of filter_expr (see compile_filter
+                        and bind_filter). When provided filter_expr is not parsed again.
             
         Returns:
             If return_paths is None:
@@ -1108,7 +1208,7 @@ class tree_data_filter:
             try:
                 #logger.debug("Converting filter expression to Python function")
                 #filter_function = converter.convert_to_python_function(filter_expr)
-                filter_function = self.convert_to_python_function(filter_expr)
+                filter_function = self.convert_to_python_function(filter_expr, compiled_filter)
                 #logger.debug("Filter function created successfully")
             except Exception as e:
                 error_msg = f"Error converting expression '{filter_expr}': {str(e)}"
@@ -38,8 +38,9 @@ Usage:
 import logging
 import os
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler
 from typing import Optional
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -261,5 +262,56 @@ def get_logger(name: Optional[str] = None) -> logging.Logger:
     
     return _logger
 
+@contextmanager
+def worker_log_environment():
+    """
+    Environment used while the worker processes of a pool are started.
+
+    Spawned and forkserver children import this module, and so run setup_logger,
+    before their initializer. With LOG_TO_FILE and LOG_TO_CONSOLE disabled that
+    import opens no handler, so only the main process writes and rotates the
+    log file. The forkserver process inherits the environment of its first use.
+    """
+    worker_env = {"LOG_TO_FILE": "false", "LOG_TO_CONSOLE": "false"}
+    saved_env = {name: os.environ.get(name) for name in worker_env}
+    os.environ.update(worker_env)
+    try:
+        yield
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def setup_worker_logger(log_queue) -> logging.Logger:
+    """
+    Configure the logger of a worker process to send its records to a queue.
+
+    Worker processes must not write to the rotating log file of the main process,
+    their records are emitted by a QueueListener running in the main process.
+
+    Args:
+        log_queue: Multiprocessing queue read by the main process
+
+    Returns:
+        Configured logger instance
+    """
+    global _logger
+
+    logger = logging.getLogger("filters")
+    logger.setLevel(DEFAULT_LOG_LEVEL)
+    logger.propagate = False
+
+    # Close any handler opened when this module was imported by the worker
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+
+    logger.addHandler(QueueHandler(log_queue))
+    _logger = logger
+
+    return logger
+
 # Initialize the logger when module is imported
 _logger = setup_logger()
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Compiled filters (compile_filter + bind_filter) must give the AST that parse
+returns for the expression with the variables substituted.
+
+Run with: python -m unittest discover tests
+"""
+import unittest
+
+from engine_processor_v2 import EngineProcessor
+
+
+class FilterPlaceholderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.processor = EngineProcessor(workers=1)
+        self.data_filter = self.processor.data_filter
+
+    def bind_and_parse(self, filter_expr, values):
+        _, highlighted, compiled = self.processor._extract_filter_variables(filter_expr)
+        literals = {v: self.processor._filter_value_literal(value) for v, value in values.items()}
+        bound = self.data_filter.bind_filter(compiled, literals)
+        parsed = self.data_filter.parse(self.processor._substitute_filter_variables(highlighted, literals))
+        return bound, parsed
+
+    def test_string_literal_with_underscores_is_kept(self):
+        bound, parsed = self.bind_and_parse("e00005v == 'x__y__z' and e00005v != e00002v", {"e00002v": 3})
+        self.assertEqual(bound, parsed)
+        # ('binop', 'and', ('binop', '==', e00005v, 'x__y__z'), ...)
+        self.assertEqual(bound[2][3], ('string', 'x__y__z'))
+
+    def test_number_and_string_values(self):
+        bound, parsed = self.bind_and_parse("e00001v == e00002v and e00003v != e00004v", {"e00002v": 3, "e00004v": "abc"})
+        self.assertEqual(bound, parsed)
+
+    def test_values_not_read_as_one_token_are_not_bound(self):
+        for value in (-3, 1.5, "it's"):
+            bound, _ = self.bind_and_parse("e00001v == e00002v", {"e00002v": value})
+            self.assertIsNone(bound)
+
+
+if __name__ == "__main__":
+    unittest.main()